@@ -10,10 +10,19 @@ Description: Removes indentation from CML (CogniCoder Markup Language) lines in
 # [[cc.block.imports]]
 import re
 import click
+from functools import partial
+from file_utils import atomic_write
 # [[/cc.block.imports]]
 
 # [[cc.block.constants]]
-CML_PATTERN = r'^\s*(#\s*\[\[/?cc\..*?\]\]|\[\[/?cc\..*?\]\])'
+# Leading whitespace of CML lines (an opening or closing cc tag, optionally after '#'), for
+# whole-buffer substitution. Every part is kept from crossing a newline so each match stays
+# within one line (the bytes form used on files does not treat non-ASCII whitespace as indentation).
+CML_INDENT_PATTERN = r'(?m)^[^\S\n]+(?=#[^\S\n]*\[\[/?cc\.[^\n]*?\]\]|\[\[/?cc\.[^\n]*?\]\])'
+_CML_INDENT_RE = re.compile(CML_INDENT_PATTERN)
+_CML_INDENT_BYTES_RE = re.compile(CML_INDENT_PATTERN.encode('ascii'))
+READ_CHUNK_SIZE = 1 << 16
+WRITE_BUFFER_SIZE = 1 << 20
 # [[/cc.block.constants]]
 
 # [[cc.block.function.remove_cml_indentation]]
@@ -27,35 +36,71 @@ def remove_cml_indentation(text):
     Returns:
         str: The text with CML lines' indentation removed.
     """
-    lines = text.split('\n')
-    processed_lines = []
+    return _CML_INDENT_RE.sub('', text)
+# [[/cc.block.function.remove_cml_indentation]]
 
-    for line in lines:
-        if re.match(CML_PATTERN, line):
-            processed_lines.append(line.lstrip())
-        else:
-            processed_lines.append(line)
+# [[cc.block.function.remove_cml_indentation_chunks]]
+def remove_cml_indentation_chunks(chunks):
+    """
+    Remove indentation from CML lines in a stream of byte chunks.
 
-    return '\n'.join(processed_lines)
-# [[/cc.block.function.remove_cml_indentation]]
+    Lines split across chunk boundaries are carried over until their newline
+    arrives, so memory use is bounded by the longest line rather than the input size.
+
+    Args:
+        chunks (iterable): Byte chunks of the input text.
+
+    Yields:
+        bytes: Processed output, one piece per chunk that completes a line.
+    """
+    # Pieces of the current unfinished line, joined once its newline arrives
+    pending = []
+    for chunk in chunks:
+        cut = chunk.rfind(b'\n') + 1
+        if not cut:
+            pending.append(chunk)
+            continue
+        pending.append(chunk[:cut])
+        # One substitution over all complete lines keeps the scan inside the regex engine
+        yield _CML_INDENT_BYTES_RE.sub(b'', b''.join(pending))
+        pending = [chunk[cut:]]
+    remainder = b''.join(pending)
+    if remainder:
+        yield _CML_INDENT_BYTES_RE.sub(b'', remainder)
+# [[/cc.block.function.remove_cml_indentation_chunks]]
+
+# [[cc.block.function.process_stream]]
+def process_stream(f_in, f_out):
+    """
+    Remove CML indentation from a binary input stream and write the result to a binary output stream.
+
+    Args:
+        f_in: Binary stream to read from.
+        f_out: Binary stream to write to.
+    """
+    for processed in remove_cml_indentation_chunks(iter(partial(f_in.read, READ_CHUNK_SIZE), b'')):
+        f_out.write(processed)
+# [[/cc.block.function.process_stream]]
 
 # [[cc.block.function.process_file]]
-def process_file(file_path):
+def process_file(file_path, in_place=False):
     """
-    Read a file, remove CML indentation, and write the result back to the file.
+    Read a file, remove CML indentation, and write the result to a new file or back to the file.
 
     Args:
         file_path (str): Path to the file to be processed.
+        in_place (bool): Whether to atomically replace the file instead of writing {file_path}.CMLINDENTOFF.
     """
+    output_file_path = file_path if in_place else f"{file_path}.CMLINDENTOFF"
     try:
-        with open(file_path, 'r') as file:
-            content = file.read()
-        
-        processed_content = remove_cml_indentation(content)
-        
-        output_file_path = f"{file_path}.CMLINDENTOFF"
-        with open(output_file_path, 'w') as file:
-            file.write(processed_content)
+        if in_place:
+            # The input is closed before atomic_write renames the temp file over it
+            with atomic_write(file_path, buffering=WRITE_BUFFER_SIZE) as f_out:
+                with open(file_path, 'rb') as f_in:
+                    process_stream(f_in, f_out)
+        else:
+            with open(file_path, 'rb') as f_in, open(output_file_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f_out:
+                process_stream(f_in, f_out)
         
         click.echo(f"Successfully processed {file_path}")
         click.echo(f"Output saved to {output_file_path}")
@@ -65,10 +110,18 @@ def process_file(file_path):
 
 # [[cc.block.main]]
 @click.command()
-@click.argument('file_path', type=click.Path(exists=True))
-def main(file_path):
+@click.argument('file_path', type=click.Path(exists=True), required=False)
+@click.option('--stdin', 'from_stdin', is_flag=True, help='Read from stdin and write the result to stdout instead of processing FILE_PATH.')
+@click.option('--in-place', is_flag=True, help='Overwrite FILE_PATH atomically instead of writing FILE_PATH.CMLINDENTOFF.')
+def main(file_path, from_stdin, in_place):
     """Remove indentation from CML lines in a file and save to a new file."""
-    process_file(file_path)
+    if from_stdin == bool(file_path):
+        raise click.UsageError("Provide exactly one of FILE_PATH or --stdin.")
+
+    if from_stdin:
+        process_stream(click.get_binary_stream('stdin'), click.get_binary_stream('stdout'))
+    else:
+        process_file(file_path, in_place)
 
 if __name__ == "__main__":
     main()
@@ -9,7 +9,10 @@ Description: Enhanced parser for Cogni Markup Language (CML) used in CogniCoder
 
 # [[cc.block.imports]]
 import re
-from typing import Dict, List, Tuple, Generator, Optional
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, List, Tuple, Generator, Optional, Union
 import io
 import json
 # [[/cc.block.imports]]
@@ -17,9 +20,326 @@ import json
 # [[cc.block.constants]]
 OUT_PATTERN = r'\[\[cc\.out\.(\w+)\]\](.*?)\[\[/cc\.out\.\1\]\]'
 BLOCK_PATTERN = r'(?:^|\n)(?:#\s*)?\[\[cc\.block((?:\.\w+)*)\]\](.*?)(?:#\s*)?\[\[/cc\.block\1\]\]'
+# Any opening or closing cc.out/cc.block tag; matches are paired up by _TagIndex instead of by backreferences
+TAG_PATTERN = r'\[\[(/?)cc\.(?:out\.(\w+)|block((?:\.\w+)*))\]\]'
 CML_SYNTAX_ERROR = "CML Syntax Error: {}"
+READ_BUFFER_SIZE = 1 << 20
+
+# Compiled once per process and shared by every CMLParser instance
+_OUT_RE = re.compile(OUT_PATTERN, re.DOTALL)
+_BLOCK_RE = re.compile(BLOCK_PATTERN, re.DOTALL)
+_TAG_RE = re.compile(TAG_PATTERN)
+BOTH_KINDS = ('out', 'block')
 # [[/cc.block.constants]]
 
+# [[cc.block.function.block_markers]]
+@lru_cache(maxsize=4096)
+def block_markers(tag: str) -> Tuple[str, str]:
+    """
+    Build the opening and closing comment lines of a cc.block tag.
+
+    Args:
+        tag (str): The block tag, e.g. 'method.parse_file'.
+
+    Returns:
+        Tuple[str, str]: The '# [[cc.block.TAG]]' and '# [[/cc.block.TAG]]' markers.
+    """
+    return f"# [[cc.block.{tag}]]", f"# [[/cc.block.{tag}]]"
+# [[/cc.block.function.block_markers]]
+
+# [[cc.block.function.out_markers]]
+@lru_cache(maxsize=4096)
+def out_markers(tag: str) -> Tuple[str, str]:
+    """
+    Build the opening and closing markers of a cc.out tag.
+
+    Args:
+        tag (str): The output tag, e.g. 'code'.
+
+    Returns:
+        Tuple[str, str]: The '[[cc.out.TAG]]' and '[[/cc.out.TAG]]' markers.
+    """
+    return f"[[cc.out.{tag}]]", f"[[/cc.out.{tag}]]"
+# [[/cc.block.function.out_markers]]
+
+# [[cc.block.function.comment_start]]
+def _comment_start(content: str, tag_start: int, lower: int) -> int:
+    """Return where an optional '#\\s*' directly before tag_start begins, or tag_start if there is none."""
+    i = tag_start
+    while i > lower and content[i - 1].isspace():
+        i -= 1
+    if i > lower and content[i - 1] == '#':
+        return i - 1
+    return tag_start
+# [[/cc.block.function.comment_start]]
+
+# [[cc.block.function.has_block_prefix]]
+def _has_block_prefix(content: str, start: int, lower: int) -> bool:
+    """Check that '(?:^|\\n)(?:#\\s*)?' can match before the block tag at start without reaching below lower."""
+    hash_pos = _comment_start(content, start, lower)
+    for prefix_start in {hash_pos, start}:
+        if prefix_start == 0 and lower == 0:
+            return True
+        if prefix_start - 1 >= lower and content[prefix_start - 1] == '\n':
+            return True
+    return False
+# [[/cc.block.function.has_block_prefix]]
+
+# [[cc.block.class.TagIndex]]
+class _TagIndex:
+    """
+    Linear-time matcher for OUT_PATTERN and BLOCK_PATTERN.
+
+    The lazy (.*?) bodies and backreferences in those patterns make the regex
+    engine scan to the end of the input for every opening tag that is never
+    closed, which is quadratic on malformed or hostile CML. _TagIndex finds every
+    tag in one pass and pairs each opening tag with the first matching closing
+    tag via bisection, yielding exactly the spans the regexes would.
+    """
+
+    # [[cc.block.method.init]]
+    def __init__(self, content: str):
+        """
+        Index all cc.out/cc.block tags in the content.
+
+        Args:
+            content (str): The content to index.
+        """
+        self.content = content
+        self.openers = []
+        self.closers = {}
+        for match in _TAG_RE.finditer(content):
+            slash, out_name, block_tag = match.groups()
+            key = ('out', out_name) if out_name is not None else ('block', block_tag)
+            if slash:
+                self.closers.setdefault(key, []).append(match.start())
+            else:
+                self.openers.append((match.start(), match.end()) + key)
+    # [[/cc.block.method.init]]
+
+    # [[cc.block.method.scan]]
+    def scan(self, kinds: Tuple[str, ...], pos: int = 0, endpos: Optional[int] = None) -> Generator[Tuple[str, str, int, int, int], None, None]:
+        """
+        Yield the non-overlapping matches finditer(content, pos, endpos) would find.
+
+        Args:
+            kinds (Tuple[str, ...]): Which patterns to match, 'out' and/or 'block'.
+            pos (int): Index to start scanning at.
+            endpos (Optional[int]): Index to stop scanning at (default: end of content).
+
+        Yields:
+            Tuple[str, str, int, int, int]: The kind, raw tag, body start, body end and match end.
+        """
+        content = self.content
+        if endpos is None:
+            endpos = len(content)
+        last_end = pos
+        openers = self.openers
+        for i in range(bisect_left(openers, (pos,)), len(openers)):
+            start, open_end, kind, tag = openers[i]
+            if open_end > endpos:
+                break
+            if kind not in kinds or start < last_end:
+                continue
+            if kind == 'block' and not _has_block_prefix(content, start, last_end):
+                continue
+
+            positions = self.closers.get((kind, tag))
+            if not positions:
+                continue
+            j = bisect_left(positions, open_end)
+            if j == len(positions):
+                continue
+            close_start = positions[j]
+            # The closing tag is the opening tag with a '/' inserted
+            close_end = close_start + (open_end - start) + 1
+            if close_end > endpos:
+                continue
+
+            body_end = close_start
+            if kind == 'block':
+                body_end = _comment_start(content, close_start, open_end)
+            yield kind, tag, open_end, body_end, close_end
+            last_end = close_end
+    # [[/cc.block.method.scan]]
+
+# [[/cc.block.class.TagIndex]]
+
+# [[cc.block.class.LineBuffer]]
+class _LineBuffer:
+    """
+    Append-only text kept as the lines it was read in.
+
+    Supports len() and integer/slice indexing with the positions of the joined text, so
+    parse_stream can grow its buffer a line at a time without joining it on every line.
+    Lines nothing will index any more can be released from the front.
+    """
+
+    __slots__ = ('lines', 'starts', 'length')
+
+    # [[cc.block.method.init]]
+    def __init__(self):
+        """Initialize an empty buffer."""
+        self.lines = []
+        self.starts = []
+        self.length = 0
+    # [[/cc.block.method.init]]
+
+    # [[cc.block.method.append]]
+    def append(self, line: str):
+        """Append a line to the buffer."""
+        if line:
+            self.lines.append(line)
+            self.starts.append(self.length)
+            self.length += len(line)
+    # [[/cc.block.method.append]]
+
+    # [[cc.block.method.release]]
+    def release(self, pos: int):
+        """Let go of the whole lines before pos; positions below their end must not be indexed afterwards."""
+        drop = bisect_right(self.starts, pos) - 1
+        # Release in bulk so trimming the lists stays amortized constant per line
+        if drop > len(self.lines) // 2:
+            del self.lines[:drop]
+            del self.starts[:drop]
+    # [[/cc.block.method.release]]
+
+    # [[cc.block.method.len]]
+    def __len__(self) -> int:
+        """Return the length of the text."""
+        return self.length
+    # [[/cc.block.method.len]]
+
+    # [[cc.block.method.getitem]]
+    def __getitem__(self, key: Union[int, slice]) -> str:
+        """Return a character or a slice of the text, as indexing the joined string would."""
+        lines, starts = self.lines, self.starts
+        if not isinstance(key, slice):
+            i = bisect_right(starts, key) - 1
+            return lines[i][key - starts[i]]
+
+        start, stop, _ = key.indices(self.length)
+        if start >= stop:
+            return ''
+        first = bisect_right(starts, start) - 1
+        last = bisect_right(starts, stop - 1) - 1
+        if first == last:
+            return lines[first][start - starts[first]:stop - starts[first]]
+        pieces = [lines[first][start - starts[first]:]]
+        pieces.extend(lines[first + 1:last])
+        pieces.append(lines[last][:stop - starts[last]])
+        return ''.join(pieces)
+    # [[/cc.block.method.getitem]]
+
+# [[/cc.block.class.LineBuffer]]
+
+# [[cc.block.class.StreamTagIndex]]
+class _StreamTagIndex:
+    """
+    Incremental matcher for parse_stream.
+
+    Gives the matches _TagIndex.scan would find when the whole buffer is rescanned from
+    each kind's resume position after every line, without rescanning. Opening tags wait in
+    per-key lists until a closing tag with their key arrives, so a line only looks at the
+    opening tags it can close.
+    """
+
+    # [[cc.block.method.init]]
+    def __init__(self):
+        """Start with an empty buffer."""
+        self.content = _LineBuffer()
+        # (kind, tag) -> [(start, end)] of opening tags that have no closing tag yet, by position
+        self.pending = {}
+        # Per kind, position where matching resumes; everything before it has been consumed
+        self.scan_pos = {kind: 0 for kind in BOTH_KINDS}
+    # [[/cc.block.method.init]]
+
+    # [[cc.block.method.add_line]]
+    def add_line(self, line: str) -> List[Tuple[str, str, int, int, int]]:
+        """
+        Append a line and return the matches it completes.
+
+        Args:
+            line (str): The next line; tags never span a newline, so each line is tokenized on its own.
+
+        Returns:
+            List[Tuple[str, str, int, int, int]]: The kind, raw tag, body start, body end and match end of each new match, by position.
+        """
+        content = self.content
+        # The previous line's matches have been read by now
+        content.release(min(self.scan_pos.values()))
+        offset = len(content)
+        content.append(line)
+        if '[[' not in line:
+            return []
+
+        pending = self.pending
+        closers = {}
+        for match in _TAG_RE.finditer(line):
+            slash, out_name, block_tag = match.groups()
+            key = ('out', out_name) if out_name is not None else ('block', block_tag)
+            if slash:
+                closers.setdefault(key, []).append(offset + match.start())
+            else:
+                pending.setdefault(key, []).append((offset + match.start(), offset + match.end()))
+        # Every match ends with a closing tag
+        if not closers:
+            return []
+
+        matches = []
+        for kind in BOTH_KINDS:
+            # Every pending opening tag before the last closing tag of its key now has a closing
+            # tag; each is matched, overlapped by a match, or fails the block prefix check for
+            # good, so all of them leave the pending lists
+            candidates = []
+            for key, positions in closers.items():
+                if key[0] != kind or key not in pending:
+                    continue
+                waiting = pending[key]
+                i = bisect_left(waiting, (positions[-1],))
+                candidates.extend((start, end, key[1], positions) for start, end in waiting[:i])
+                if i == len(waiting):
+                    del pending[key]
+                else:
+                    del waiting[:i]
+            if candidates:
+                self._match(kind, sorted(candidates), matches)
+
+        matches.sort(key=itemgetter(2))
+        return matches
+    # [[/cc.block.method.add_line]]
+
+    # [[cc.block.method._match]]
+    def _match(self, kind: str, candidates: List[Tuple[int, int, str, List[int]]], matches: List[Tuple[str, str, int, int, int]]):
+        """
+        Pair candidate opening tags of one kind with the line's closing tags, as _TagIndex.scan does.
+
+        Args:
+            kind (str): 'out' or 'block'.
+            candidates (List[Tuple[int, int, str, List[int]]]): Start, end, tag and the positions of the
+                line's closing tags with that tag, for each opening tag that has a closing tag, by position.
+            matches (List[Tuple[str, str, int, int, int]]): Receives the new matches.
+        """
+        content = self.content
+        last_end = self.scan_pos[kind]
+        for start, open_end, tag, positions in candidates:
+            if start < last_end:
+                continue
+            if kind == 'block' and not _has_block_prefix(content, start, last_end):
+                continue
+            close_start = positions[bisect_left(positions, open_end)]
+            # The closing tag is the opening tag with a '/' inserted
+            close_end = close_start + (open_end - start) + 1
+            body_end = close_start
+            if kind == 'block':
+                body_end = _comment_start(content, close_start, open_end)
+            matches.append((kind, tag, open_end, body_end, close_end))
+            last_end = close_end
+        self.scan_pos[kind] = last_end
+    # [[/cc.block.method._match]]
+
+# [[/cc.block.class.StreamTagIndex]]
+
 # [[cc.block.class.CMLParser]]
 class CMLParser:
     """Enhanced parser for Cogni Markup Language (CML) used in CogniCoder output and code blocks"""
@@ -27,8 +347,8 @@ class CMLParser:
     # [[cc.block.method.init]]
     def __init__(self):
         """Initialize the CMLParser."""
-        self.out_regex = re.compile(OUT_PATTERN, re.DOTALL)
-        self.block_regex = re.compile(BLOCK_PATTERN, re.DOTALL)
+        self.out_regex = _OUT_RE
+        self.block_regex = _BLOCK_RE
     # [[/cc.block.method.init]]
 
     # [[cc.block.method.parse_out_blocks]]
@@ -46,7 +366,7 @@ class CMLParser:
             ValueError: If the CML syntax is invalid.
         """
         try:
-            return dict(self.out_regex.findall(content))
+            return {tag: content[start:end] for _, tag, start, end, _ in _TagIndex(content).scan(('out',))}
         except Exception as e:
             raise ValueError(CML_SYNTAX_ERROR.format(str(e)))
     # [[/cc.block.method.parse_out_blocks]]
@@ -66,7 +386,8 @@ class CMLParser:
             ValueError: If the CML syntax is invalid.
         """
         try:
-            return [(tag.strip('.'), block_content) for tag, block_content in self.block_regex.findall(content)]
+            # The captured tag is either empty or starts with a single '.', so slicing replaces strip('.')
+            return [(tag[1:], content[start:end]) for _, tag, start, end, _ in _TagIndex(content).scan(('block',))]
         except Exception as e:
             raise ValueError(CML_SYNTAX_ERROR.format(str(e)))
     # [[/cc.block.method.parse_code_blocks]]
@@ -87,8 +408,9 @@ class CMLParser:
             ValueError: If the CML syntax is invalid.
         """
         try:
-            with open(file_path, 'r') as file:
-                content = file.read()
+            # Whole-file read: decode once instead of going through the text I/O layer
+            with open(file_path, 'rb', buffering=READ_BUFFER_SIZE) as file:
+                content = file.read().decode('utf-8')
         except FileNotFoundError:
             raise FileNotFoundError(f"File not found: {file_path}")
 
@@ -110,12 +432,14 @@ class CMLParser:
             ValueError: If the CML syntax is invalid.
         """
         try:
-            return {
-                'out': self.parse_out_blocks(content),
-                'block': self.parse_code_blocks(content)
-            }
-        except ValueError as e:
-            raise ValueError(f"Error parsing content: {str(e)}")
+            # Tags are found in one pass; each kind is then paired on its own, as separate
+            # scans would, so an out block and a block that cross are both reported
+            index = _TagIndex(content)
+            out_dict = {tag: content[start:end] for _, tag, start, end, _ in index.scan(('out',))}
+            block_list = [(tag[1:], content[start:end]) for _, tag, start, end, _ in index.scan(('block',))]
+        except Exception as e:
+            raise ValueError(f"Error parsing content: {CML_SYNTAX_ERROR.format(str(e))}")
+        return {'out': out_dict, 'block': block_list}
     # [[/cc.block.method.parse_content]]
 
     # [[cc.block.method.parse_stream]]
@@ -132,26 +456,14 @@ class CMLParser:
         Raises:
             ValueError: If the CML syntax is invalid.
         """
-        buffer = ""
+        index = _StreamTagIndex()
+        content = index.content
         for line in stream:
-            buffer += line
-            out_matches = list(self.out_regex.finditer(buffer))
-            block_matches = list(self.block_regex.finditer(buffer))
-            
-            for match in out_matches + block_matches:
-                if match.re is self.out_regex:
-                    yield {'type': 'out', 'tag': match.group(1), 'content': match.group(2)}
+            for kind, tag, start, end, _ in index.add_line(line):
+                if kind == 'out':
+                    yield {'type': 'out', 'tag': tag, 'content': content[start:end]}
                 else:
-                    yield {'type': 'block', 'tag': match.group(1).strip('.'), 'content': match.group(2).strip()}
-                
-                buffer = buffer[match.end():]
-        
-        # Process any remaining content in the buffer
-        for match in self.out_regex.finditer(buffer) + self.block_regex.finditer(buffer):
-            if match.re is self.out_regex:
-                yield {'type': 'out', 'tag': match.group(1), 'content': match.group(2)}
-            else:
-                yield {'type': 'block', 'tag': match.group(1).strip('.'), 'content': match.group(2).strip()}
+                    yield {'type': 'block', 'tag': tag[1:], 'content': content[start:end].strip()}
     # [[/cc.block.method.parse_stream]]
 
     # [[cc.block.method.generate_cml_block]]
@@ -171,9 +483,11 @@ class CMLParser:
             ValueError: If an invalid block type is provided.
         """
         if block_type == 'out':
-            return f"[[cc.out.{tag}]]{content}[[/cc.out.{tag}]]"
+            start, end = out_markers(tag)
+            return f"{start}{content}{end}"
         elif block_type == 'block':
-            return f"# [[cc.block.{tag}]]\n{content}\n# [[/cc.block.{tag}]]"
+            start, end = block_markers(tag)
+            return f"{start}\n{content}\n{end}"
         else:
             raise ValueError(f"Invalid block type: {block_type}")
     # [[/cc.block.method.generate_cml_block]]
@@ -10,14 +10,14 @@ Description: CML (Cogni Markup Language) Tagger using Anthropic's API with Click
 # [[cc.block.imports]]
 import os
 import click
-from anthropic import Anthropic
+from utils import get_client
 from datetime import datetime
 # [[/cc.block.imports]]
 
 # [[cc.block.constants]]
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
-#MODEL = "claude-3-5-sonnet-20240620"
-MODEL = "claude-3-haiku-20240307"
+MODEL = "claude-haiku-4-5"
+MODEL_CHOICES = {"fast": MODEL, "balanced": "claude-3-5-sonnet-latest"}
 MAX_TOKENS = 4000
 TEMPERATURE = 0.7
 OUTPUT_DIR = "./output"
@@ -32,17 +32,18 @@ class CMLTagger:
         """Initialize the CMLTagger class."""
         if not ANTHROPIC_API_KEY:
             raise ValueError("ANTHROPIC_API_KEY environment variable is not set")
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.client = get_client(ANTHROPIC_API_KEY)
     # [[/cc.block.method.init]]
 
     # [[cc.block.method.add_cml_tags]]
-    def add_cml_tags(self, code: str, language: str) -> str:
+    def add_cml_tags(self, code: str, language: str, model: str = MODEL) -> str:
         """
         Add CML tags to the given code using Anthropic's API.
 
         Args:
             code (str): The original code to be tagged.
             language (str): The programming language of the code.
+            model (str): The Claude model to use (default: MODEL).
 
         Returns:
             str: The tagged code.
@@ -51,7 +52,7 @@ class CMLTagger:
         
         try:
             response = self.client.messages.create(
-                model=MODEL,
+                model=model,
                 max_tokens=MAX_TOKENS,
                 temperature=TEMPERATURE,
                 messages=[
@@ -134,30 +135,31 @@ Please add CML tags to this code following the guidelines above. Return only the
 @click.command()
 @click.option('--original', required=True, type=click.Path(exists=True), help='Path to the original code file')
 @click.option('--output', default=None, type=click.Path(), help='Path to save the tagged code (default: original_tagged.ext)')
-def tag_file(original: str, output: str):
+@click.option('--model', default='fast', type=click.Choice(list(MODEL_CHOICES), case_sensitive=False), help='Model tier: fast (Haiku) or balanced (Sonnet).')
+def tag_file(original: str, output: str, model: str):
     """
     Add CML tags to the specified file and save the result.
 
     Args:
         original (str): Path to the original code file.
         output (str): Path to save the tagged code (default: original_tagged.ext).
+        model (str): Model tier to use, either 'fast' or 'balanced'.
     """
     # Read the original file
     with open(original, 'r') as file:
         code = file.read()
 
     # Determine the language based on file extension
-    _, ext = os.path.splitext(original)
+    base, ext = os.path.splitext(original)
     language = ext.lstrip('.')
 
     # Create CMLTagger instance and add tags
     tagger = CMLTagger()
-    tagged_code = tagger.add_cml_tags(code, language)
+    tagged_code = tagger.add_cml_tags(code, language, MODEL_CHOICES[model.lower()])
 
     if tagged_code:
         # Determine output file path
         if not output:
-            base, ext = os.path.splitext(original)
             output = f"{base}_tagged{ext}"
 
         # Save the tagged code
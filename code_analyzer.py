@@ -11,7 +11,7 @@ Description: Program to analyze Python files and generate detailed explanations
 import os
 import click
 import json
-from anthropic import Anthropic
+from utils import get_client
 from datetime import datetime
 # [[/cc.block.imports]]
 
@@ -30,7 +30,7 @@ class CodeAnalyzer:
 # [[cc.block.method.init]]
     def __init__(self):
         """Initialize the CodeAnalyzer class."""
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.client = get_client(ANTHROPIC_API_KEY)
 # [[/cc.block.method.init]]
 
 # [[cc.block.method.analyze_code]]
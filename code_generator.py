@@ -9,20 +9,88 @@ Description: CogniCoder app for generating code using Claude API with Click CLI,
 
 # [[cc.block.imports]]
 import os
+import sys
 import json
+import asyncio
 import click
-from anthropic import Anthropic
+from utils import get_client, get_async_client
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 # [[/cc.block.imports]]
 
 # [[cc.block.constants]]
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
 MODEL = "claude-3-5-sonnet-latest"
+FAST_MODEL = "claude-haiku-4-5"
+MODEL_CHOICES = {"fast": FAST_MODEL, "balanced": MODEL}
 MAX_TOKENS = 4000
+MAX_TOKENS_BY_MODE = {"PATCH": 1500, "NEW": 3000, "FULL": 4000}
 TEMPERATURE = 0.7
 OUTPUT_DIR = "./output"
+READ_WORKERS = 8
+BATCH_CONCURRENCY = 8
 # [[/cc.block.constants]]
 
+# [[cc.block.system_prompts]]
+SYSTEM_PROMPT_CORE = """# CogniCoder: Custom Instructions for Code Generation and Patching
+CogniCoder generates and patches Python and Lua code using metadata blocks, allowing granular updates while keeping the code structure intact.
+
+## Metadata Blocks
+- Opening tag: # [[cc.block.subtag1.subtag2]]; closing tag: # [[/cc.block.subtag1.subtag2]]. Always place tags inside comments.
+- Nest at most 2 levels deep (only for class methods).
+- Naming: class.ClassName, method.methodname (inside its class block), function.functionname, imports, constants, main, tests, metadata.
+
+## Indentation
+- Use consistent indentation (4 spaces for Python) and keep new or modified blocks correctly indented relative to their parent blocks.
+
+## Output
+Respond in the [[cc.out.*]] format given in the user message. The explanation should be comprehensive and LLM-friendly, describing what the code does, why decisions were made, and any changes to indentation or structure.
+"""
+
+SYSTEM_PROMPT_MODES = {
+    "FULL": """
+## Generation Mode: FULL
+- Create a complete file with all necessary blocks and no removal tags.
+- If previous code is provided, improve upon it while keeping its overall structure.
+- Use the additional documentation to keep the code up-to-date and accurate.
+""",
+    "PATCH": """
+## Generation Mode: PATCH
+- Output a patch against the previous code, not a complete file: only the blocks to change, add, or remove.
+- Delete blocks with: # [[cc.block.remove]]block_identifier[[/cc.block.remove]]
+- Put new class methods in a method block inside the existing class block.
+- Match the indentation of the surrounding context exactly.
+- Use the additional documentation to stay compatible with the latest API or library versions.
+""",
+    "NEW": """
+## Generation Mode: NEW
+- Create a complete, functional new file from scratch with all necessary blocks.
+- Do not depend on previous code unless the prompt says so.
+- Use the additional documentation to follow current best practices.
+""",
+}
+
+SYSTEM_PROMPT_BEST_PRACTICES = """
+## Best Practices
+1. Include version number and last update date in the metadata block.
+2. Provide docstrings for functions and classes and brief comments for complex logic.
+3. Order: metadata, imports, constants, functions, classes, main code, tests.
+4. Include appropriate error handling and descriptive names; follow language conventions (e.g., PEP 8).
+5. Include unit tests for key functionality.
+6. Define constants in # [[cc.block.constants]] and wrap main code in a `main()` function within # [[cc.block.main]].
+7. Cite additional documentation in comments where it justifies an implementation.
+"""
+# [[/cc.block.system_prompts]]
+
+# [[cc.block.function.build_system_prompt]]
+def _build_system_prompt(mode):
+    """Assemble the system prompt for the given generation mode."""
+    return "".join([SYSTEM_PROMPT_CORE, SYSTEM_PROMPT_MODES.get(mode, ""), SYSTEM_PROMPT_BEST_PRACTICES])
+
+
+_SYSTEM_PROMPTS = {mode: _build_system_prompt(mode) for mode in SYSTEM_PROMPT_MODES}
+# [[/cc.block.function.build_system_prompt]]
+
 # [[cc.block.class.CogniCoder]]
 class CogniCoder:
     """CogniCoder class for generating code using Claude API."""
@@ -30,13 +98,28 @@ class CogniCoder:
     # [[cc.block.method.init]]
     def __init__(self):
         """Initialize the CogniCoder class."""
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.client = get_client(ANTHROPIC_API_KEY)
     # [[/cc.block.method.init]]
 
     # [[cc.block.method.generate_code]]
-    def generate_code(self, prompt, mode="FULL", previous_code=None, error_messages=None, documentation=None, other_code_files=None):
+    def generate_code(self, prompt, mode="FULL", previous_code=None, error_messages=None, documentation=None, other_code_files=None, model=None):
         """
-        Generate code using Claude API.
+        Generate code using Claude API and return the complete response.
+
+        Takes the same arguments as stream_code.
+
+        Returns:
+            str: The raw response from the Claude API.
+        """
+        return "".join(self.stream_code(
+            prompt, mode, previous_code, error_messages, documentation, other_code_files, model=model
+        ))
+    # [[/cc.block.method.generate_code]]
+
+    # [[cc.block.method.stream_code]]
+    def stream_code(self, prompt, mode="FULL", previous_code=None, error_messages=None, documentation=None, other_code_files=None, model=None):
+        """
+        Generate code using Claude API, yielding text deltas as they arrive.
 
         Args:
             prompt (str): The prompt for code generation.
@@ -45,10 +128,50 @@ class CogniCoder:
             error_messages (list): List of error messages (optional).
             documentation (list): List of documentation files (optional).
             other_code_files (list): List of other relevant code files (optional).
+            model (str): The Claude model to use (optional). PATCH mode defaults to FAST_MODEL, others to MODEL.
+
+        Yields:
+            str: Chunks of the raw response from the Claude API.
+        """
+        request = self._build_request(prompt, mode, previous_code, error_messages, documentation, other_code_files, model)
+        with self.client.messages.stream(**request) as stream:
+            yield from stream.text_stream
+    # [[/cc.block.method.stream_code]]
+
+    # [[cc.block.method.generate_code_async]]
+    async def generate_code_async(self, prompt, mode="FULL", previous_code=None, error_messages=None, documentation=None, other_code_files=None, model=None):
+        """
+        Generate code using the async Claude client so several requests can run concurrently.
+
+        Takes the same arguments as stream_code.
 
         Returns:
             str: The raw response from the Claude API.
         """
+        request = self._build_request(prompt, mode, previous_code, error_messages, documentation, other_code_files, model)
+        response = await get_async_client(ANTHROPIC_API_KEY).messages.create(**request)
+        return response.content[0].text
+    # [[/cc.block.method.generate_code_async]]
+
+    # [[cc.block.method.build_request]]
+    def _build_request(self, prompt, mode="FULL", previous_code=None, error_messages=None, documentation=None, other_code_files=None, model=None):
+        """
+        Build the Messages API request arguments for a code generation call.
+
+        Args:
+            prompt (str): The prompt for code generation.
+            mode (str): The generation mode, either "FULL", "PATCH", or "NEW".
+            previous_code (str): The previous code to be altered (optional).
+            error_messages (list): List of error messages (optional).
+            documentation (list): List of documentation files (optional).
+            other_code_files (list): List of other relevant code files (optional).
+            model (str): The Claude model to use (optional). PATCH mode defaults to FAST_MODEL, others to MODEL.
+
+        Returns:
+            dict: Keyword arguments for client.messages.create or client.messages.stream.
+        """
+        if model is None:
+            model = FAST_MODEL if mode == "PATCH" else MODEL
         system_prompt = self._get_system_prompt(mode)
         
         user_message = f"""Prompt: {prompt}
@@ -84,47 +207,66 @@ Ensure that the code field preserves all necessary indentation and formatting, a
             for msg in error_messages:
                 user_message += f"- {msg}\n"
             user_message += "\n"
+
+        # Documentation and other code files repeat across calls and dominate the input, so they
+        # go first and end in the cache breakpoint; the system prompt alone is too short to cache
+        shared_context = ""
         if documentation:
-            user_message += "Additional documentation:\n"
+            shared_context += "Additional documentation:\n"
             for doc in documentation:
-                user_message += f"{doc}\n\n"
+                shared_context += f"{doc}\n\n"
         if other_code_files:
-            user_message += "Other relevant code files:\n"
+            shared_context += "Other relevant code files:\n"
             for file in other_code_files:
-                user_message += f"File: {file['name']}\n```\n{file['content']}\n```\n\n"
-        
-        response = self.client.messages.create(
-            model=MODEL,
-            max_tokens=MAX_TOKENS,
-            temperature=TEMPERATURE,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": user_message}
-            ]
-        )
-
-        return response.content[0].text
-    # [[/cc.block.method.generate_code]]
+                shared_context += f"File: {file['name']}\n```\n{file['content']}\n```\n\n"
+
+        content = []
+        if shared_context:
+            content.append({"type": "text", "text": shared_context, "cache_control": {"type": "ephemeral"}})
+        content.append({"type": "text", "text": user_message})
+
+        return {
+            "model": model,
+            "max_tokens": MAX_TOKENS_BY_MODE.get(mode, MAX_TOKENS),
+            "temperature": TEMPERATURE,
+            "system": system_prompt,
+            "messages": [
+                {"role": "user", "content": content}
+            ],
+        }
+    # [[/cc.block.method.build_request]]
 
     # [[cc.block.method.save_response]]
-    def save_response(self, response, output_file):
+    def save_response(self, response, output_file, echo=False):
         """
-        Save the raw response to a file.
+        Save the raw response to a file, writing streamed chunks as they arrive.
 
         Args:
-            response (str): The raw response from the API.
-            output_file (str): The filename to save the response to.
+            response (str or iterable): The raw response from the API, or an iterable of its chunks.
+            output_file (str or file): The filename or open text file to save the response to.
+            echo (bool): Whether to echo each chunk to stdout (stderr when writing to stdout) as it is written.
 
         Returns:
             str: The filename of the saved response.
         """
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        with open(output_file, 'w') as f:
-            f.write(response)
-        
-        click.echo(f"Raw response saved to {output_file}")
-        return output_file
+        if isinstance(output_file, str):
+            os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+            with open(output_file, 'w') as f:
+                return self.save_response(response, f, echo)
+
+        # Keep stdout clean for the next pipeline stage when writing the response there
+        to_stdout = output_file is sys.stdout
+        chunks = [response] if isinstance(response, str) else response
+        for chunk in chunks:
+            output_file.write(chunk)
+            output_file.flush()
+            if echo:
+                click.echo(chunk, nl=False, err=to_stdout)
+        if echo:
+            click.echo(err=to_stdout)
+
+        click.echo(f"Raw response saved to {output_file.name}", err=to_stdout)
+        return output_file.name
     # [[/cc.block.method.save_response]]
 
     # [[cc.block.method.get_system_prompt]]
@@ -138,106 +280,8 @@ Ensure that the code field preserves all necessary indentation and formatting, a
         Returns:
             str: The system prompt for Claude.
         """
-        base_prompt = """
-        # CogniCoder: Custom Instructions for Code Generation and Patching
-
-        ## Overview
-        CogniCoder is a system for generating and patching code using metadata blocks. It supports Python and Lua, allowing for granular updates and maintaining code structure integrity.
-
-        ## Metadata Block Structure
-        - Use double square brackets with cc.block prefix for metadata blocks.
-        - Format: # [[cc.block.subtag1.subsubtag2]] for opening, # [[/cc.block.subtag1.subsubtag2]] for closing.
-        - Always place these tags inside comments.
-        - Allow nesting up to 2 levels deep (only for class methods).
-
-        ## Block Naming Conventions
-        - Classes: # [[cc.block.class.classname]]
-        - Methods within classes: # [[cc.block.method.methodname]]
-        - Standalone functions: # [[cc.block.function.functionname]]
-        - Imports: # [[cc.block.imports]]
-        - Constants: # [[cc.block.constants]]
-        - Main sections: # [[cc.block.main]]
-        - Tests: # [[cc.block.tests]]
-        - Metadata: # [[cc.block.metadata]]
-
-        ## Indentation and Code Structure
-        - Maintain correct indentation for all generated code.
-        - For patches, ensure that the indentation of new or modified code matches the surrounding context.
-        - Use consistent indentation (e.g., 4 spaces for Python) throughout the generated code.
-        - When adding new blocks or modifying existing ones, make sure the indentation is correct relative to the parent blocks.
-
-        ## Output Format
-        Your response should be structured as follows:
-        [[cc.out.filename]]inferred_filename[[/cc.out.filename]]
-        [[cc.out.mode]]FULL, PATCH, or NEW[[/cc.out.mode]]
-        [[cc.out.code]]
-        # [[cc.block.metadata]]
-        '''
-        File: inferred_filename.py
-        Version: 1.0.0
-        Last Updated: current_date
-        Description: Brief description of the file's purpose
-        '''
-        # [[/cc.block.metadata]]
-
-        # Generated code here, with all necessary [[cc.block]] tags inside comments
-        [[/cc.out.code]]
-        [[cc.out.explanation]]
-        detailed explanation
-        [[/cc.out.explanation]]
-
-        The explanation should be comprehensive and LLM-friendly, describing what the code does, why certain decisions were made, and any changes to the indentation or structure (if applicable).
-        """
-
-        if mode == "FULL":
-            base_prompt += """
-            ## Generation Mode: FULL
-            - Create a complete file structure with correct indentation throughout.
-            - Include all necessary blocks.
-            - Do not use removal tags.
-            - If previous code is provided, use it as a starting point and improve upon it while maintaining its overall structure.
-            - Incorporate the additional documentation to ensure the generated code is up-to-date and accurate.
-            """
-        elif mode == "PATCH":
-            base_prompt += """
-            ## Generation Mode: PATCH
-            - Only include blocks to be changed, added, or removed.
-            - Use removal tags for deletions.
-            - For new class methods, create method block inside existing class block with correct indentation.
-            - Use removal syntax for deleting blocks: # [[cc.block.remove]]block_identifier[[/cc.block.remove]]
-            - Focus on addressing specific issues or adding new functionality to the previous code.
-            - Ensure that the indentation of new or modified code matches the surrounding context exactly.
-            - If adding new blocks, make sure they are indented correctly relative to their parent blocks.
-            - Use the additional documentation to guide your patching process and ensure compatibility with the latest API or library versions.
-            - The output should be a patch that can be applied to the existing code, not a complete file.
-            """
-        elif mode == "NEW":
-            base_prompt += """
-            ## Generation Mode: NEW
-            - Create a new file from scratch with correct and consistent indentation.
-            - Include all necessary blocks for a complete and functional new file.
-            - Do not reference or depend on previous code unless explicitly mentioned in the prompt.
-            - Utilize the additional documentation to ensure the new code is up-to-date and follows best practices.
-            """
-
-        base_prompt += """
-        ## Best Practices
-        1. Include version number and last update date in metadata block.
-        2. Provide detailed docstrings for functions and classes.
-        3. Include brief comments explaining complex logic.
-        4. Maintain consistent order: metadata, imports, constants, functions, classes, main code, tests.
-        5. Include appropriate error handling.
-        6. Use descriptive names for variables, functions, and classes.
-        7. Follow language-specific conventions (e.g., PEP 8 for Python).
-        8. Include unit tests for key functionality.
-        9. Define constants in a dedicated # [[cc.block.constants]] block.
-        10. Encapsulate main code in a `main()` function within the # [[cc.block.main]] block.
-        11. When using additional documentation, cite the source in comments to justify decisions or implementations.
-        12. Always maintain correct and consistent indentation, especially for patches and nested structures.
-
-        Generate code according to these instructions, the provided prompt, and any additional context given, including the up-to-date documentation. Pay special attention to indentation and code structure to ensure the generated code can be seamlessly integrated or run without indentation-related errors.
-        """
-        return base_prompt
+        prompt = _SYSTEM_PROMPTS.get(mode)
+        return prompt if prompt is not None else _build_system_prompt(mode)
     # [[/cc.block.method.get_system_prompt]]
 
 # [[/cc.block.class.CogniCoder]]
@@ -249,6 +293,60 @@ def read_file_content(file_path):
         return f.read()
 # [[/cc.block.function.read_file_content]]
 
+# [[cc.block.function.read_file_bytes]]
+def read_file_bytes(file_path):
+    """
+    Read a whole file as bytes, bypassing the text and buffering layers.
+
+    An unbuffered FileIO sizes its buffer from fstat, so the content is read into
+    one preallocated buffer instead of being copied out of a BufferedReader.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        bytes: The raw file content.
+    """
+    with open(file_path, 'rb', buffering=0) as f:
+        return f.readall()
+# [[/cc.block.function.read_file_bytes]]
+
+# [[cc.block.function.read_file_contents]]
+def read_file_contents(file_paths):
+    """Read several files concurrently and return their decoded contents in the same order."""
+    if not file_paths:
+        return []
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(file_paths))) as executor:
+        return [data.decode('utf-8') for data in executor.map(read_file_bytes, file_paths)]
+# [[/cc.block.function.read_file_contents]]
+
+# [[cc.block.function.run_batch]]
+async def run_batch(cognicoder, jobs, output_file, model=None):
+    """
+    Run several generation jobs concurrently and save each response.
+
+    Args:
+        cognicoder (CogniCoder): The CogniCoder instance to generate with.
+        jobs (list): Prompts, either plain strings or dicts with 'prompt' and optional 'mode' and 'output_file'.
+        output_file (str): Template filename; job i without its own output_file is saved as <name>_<i><ext>.
+        model (str): The Claude model to use (optional).
+
+    Returns:
+        list: The filenames of the saved responses, in job order.
+    """
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    base, ext = os.path.splitext(output_file)
+
+    async def run_job(index, job):
+        if isinstance(job, str):
+            job = {'prompt': job}
+        async with semaphore:
+            response = await cognicoder.generate_code_async(job['prompt'], job.get('mode', 'FULL').upper(), model=model)
+        return cognicoder.save_response(response, job.get('output_file', f"{base}_{index}{ext}"))
+
+    return await asyncio.gather(*[run_job(i, job) for i, job in enumerate(jobs)])
+# [[/cc.block.function.run_batch]]
+
 # [[cc.block.main]]
 @click.command()
 @click.option('--prompt', help='The prompt for code generation.')
@@ -259,19 +357,32 @@ def read_file_content(file_path):
 @click.option('--other-code-file', type=click.File('r'), help='Other relevant code file.')
 @click.option('--input-json', type=click.File('r'), help='JSON file containing all input parameters.')
 @click.option('--output-file', default='./output/result.out', help='The filename to save the raw response.')
-def main(prompt, mode, previous_code, error_message, documentation, other_code_file, input_json, output_file):
+@click.option('--model', type=click.Choice(list(MODEL_CHOICES), case_sensitive=False), help='Model tier: fast (Haiku) or balanced (Sonnet). Defaults to fast for PATCH mode, balanced otherwise.')
+@click.option('--echo/--no-echo', default=False, help='Echo the response to stdout as it streams in.')
+@click.option('--stdout', 'to_stdout', is_flag=True, help='Write the raw response to stdout instead of --output-file, e.g. to pipe into output_parser --stdin.')
+@click.option('--batch-json', type=click.File('r'), help='JSON list of prompts (strings or objects with prompt, mode and output_file) to generate concurrently.')
+def main(prompt, mode, previous_code, error_message, documentation, other_code_file, input_json, output_file, model, echo, to_stdout, batch_json):
     """CogniCoder: Generate or patch code using Claude API with support for additional documentation and context."""
     cognicoder = CogniCoder()
 
+    if batch_json:
+        jobs = json.load(batch_json)
+        asyncio.run(run_batch(cognicoder, jobs, output_file, MODEL_CHOICES[model.lower()] if model else None))
+        return
+
     if input_json:
         # Use input from JSON file
         input_data = json.load(input_json)
         prompt = input_data.get('prompt', '')
         mode = input_data.get('mode', 'FULL')
         previous_code_content = read_file_content(input_data['previous_code']) if 'previous_code' in input_data else None
-        error_messages = [read_file_content(f) for f in input_data.get('error_messages', [])]
-        documentation_content = [read_file_content(f) for f in input_data.get('documentation', [])]
-        other_code_files = [{'name': f, 'content': read_file_content(f)} for f in input_data.get('other_code_files', [])]
+        error_files = input_data.get('error_messages', [])
+        documentation_files = input_data.get('documentation', [])
+        other_files = input_data.get('other_code_files', [])
+        contents = read_file_contents(error_files + documentation_files + other_files)
+        error_messages = contents[:len(error_files)]
+        documentation_content = contents[len(error_files):len(error_files) + len(documentation_files)]
+        other_code_files = [{'name': f, 'content': c} for f, c in zip(other_files, contents[len(error_files) + len(documentation_files):])]
     else:
         # Use command-line arguments
         if not prompt:
@@ -283,11 +394,12 @@ def main(prompt, mode, previous_code, error_message, documentation, other_code_f
         documentation_content = [documentation.read()] if documentation else None
         other_code_files = [{'name': other_code_file.name, 'content': other_code_file.read()}] if other_code_file else None
 
-    response = cognicoder.generate_code(
-        prompt, mode.upper(), previous_code_content, error_messages, documentation_content, other_code_files
+    response = cognicoder.stream_code(
+        prompt, mode.upper(), previous_code_content, error_messages, documentation_content, other_code_files,
+        model=MODEL_CHOICES[model.lower()] if model else None
     )
     
-    cognicoder.save_response(response, output_file)
+    cognicoder.save_response(response, sys.stdout if to_stdout else output_file, echo)
 
 if __name__ == "__main__":
     main()
@@ -9,17 +9,31 @@ Description: CogniCoder Markup Language (CML) code patcher for applying patches
 
 # [[cc.block.imports]]
 import os
+import re
 import click
 from datetime import datetime
-from cml_parser import CMLParser
-from typing import List, Tuple
+from functools import lru_cache
+from cml_parser import CMLParser, block_markers, READ_BUFFER_SIZE
+from file_utils import atomic_write
+from typing import List, Optional, Tuple
 # [[/cc.block.imports]]
 
 # [[cc.block.constants]]
 PATCHED_EXTENSION = ".PATCHED"
 INDENT_EXTENSION = "_INDENT"
+BLOCK_TAG_PATTERN = r'# \[\[(/?)cc\.block\.([\w.]+)\]\]'
+_BLOCK_TAG_RE = re.compile(BLOCK_TAG_PATTERN)
 # [[/cc.block.constants]]
 
+# [[cc.block.function._load_patch_cached]]
+# Keyed on the modification time so an edited patch file is parsed again
+@lru_cache(maxsize=32)
+def _load_patch_cached(patch_file: str, mtime_ns: int) -> Tuple[Tuple[str, str], ...]:
+    with open(patch_file, 'rb', buffering=READ_BUFFER_SIZE) as f:
+        patch_content = f.read().decode('utf-8')
+    return tuple(CMLParser().parse_content(patch_content)['block'])
+# [[/cc.block.function._load_patch_cached]]
+
 # [[cc.block.class.CodePatcherCML]]
 class CodePatcherCML:
     # [[cc.block.method.__init__]]
@@ -29,14 +43,16 @@ class CodePatcherCML:
         self.cml_parser = CMLParser()
         self.patch_content = self._load_patch_file()
         self.patched_blocks = set()
+        # One compiled open...close span regex per tag the patch touches
+        self._span_re = {}
+        for block_type, _ in self.patch_content:
+            self._span_regex(block_type.replace('remove.', ''))
     # [[/cc.block.method.__init__]]
 
     # [[cc.block.method._load_patch_file]]
     def _load_patch_file(self) -> List[Tuple[str, str]]:
         try:
-            with open(self.patch_file, 'r') as f:
-                patch_content = f.read()
-            return self.cml_parser.parse_content(patch_content)['block']
+            return list(_load_patch_cached(self.patch_file, os.stat(self.patch_file).st_mtime_ns))
         except Exception as e:
             raise click.ClickException(f"Error loading patch file: {str(e)}")
     # [[/cc.block.method._load_patch_file]]
@@ -47,14 +63,13 @@ class CodePatcherCML:
             raise FileNotFoundError(f"Original file not found: {self.original_file}")
 
         try:
-            with open(self.original_file, 'r') as f:
-                original_content = f.read()
+            with open(self.original_file, 'rb', buffering=READ_BUFFER_SIZE) as f:
+                original_content = f.read().decode('utf-8')
 
             patched_content = self._process_patch(original_content)
 
             patched_file = f"{self.original_file}{PATCHED_EXTENSION}"
-            with open(patched_file, 'w') as f:
-                f.write(patched_content)
+            self._write_atomic(patched_file, patched_content.encode('utf-8'))
 
             click.echo(f"Successfully created patched file: {patched_file}")
             return patched_file
@@ -62,12 +77,94 @@ class CodePatcherCML:
             raise click.ClickException(f"Error applying patch: {str(e)}")
     # [[/cc.block.method.apply_patch]]
 
+    # [[cc.block.method._write_atomic]]
+    def _write_atomic(self, path: str, data: bytes):
+        # Write a sibling temp file and rename it over the target, so a crash never
+        # leaves a partially written patched file behind
+        with atomic_write(path, mode_from=self.original_file) as f:
+            f.write(data)
+    # [[/cc.block.method._write_atomic]]
+
     # [[cc.block.method._process_patch]]
     def _process_patch(self, original_content: str) -> str:
+        for block_type, _ in self.patch_content:
+            click.echo(f"Applying patch on code block '[[cc.block.{block_type}]]'")
+
+        patched_content = self._splice_patch(original_content)
+        if patched_content is None:
+            patched_content = self._apply_patch_sequentially(original_content)
+        return patched_content
+    # [[/cc.block.method._process_patch]]
+
+    # [[cc.block.method._splice_patch]]
+    def _splice_patch(self, original_content: str) -> Optional[str]:
+        # Locate every block tag once, turn each patch block into a (start, end, replacement)
+        # edit on the original and splice them with a single join. Returns None when patch
+        # blocks interact (same tag twice, overlapping spans, or a tag introduced by an
+        # earlier patch block); those patches need sequential application.
+        opens, closes = {}, {}
+        for match in _BLOCK_TAG_RE.finditer(original_content):
+            index = closes if match.group(1) else opens
+            index.setdefault(match.group(2), (match.start(), match.end()))
+
+        edits = []
+        appends = []
+        seen_tags = set()
+        introduced = []
+        for block_type, block_content in self.patch_content:
+            removal = 'remove' in block_type
+            tag = block_type.replace('remove.', '') if removal else block_type
+            block_start, block_end = block_markers(tag)
+            if tag in seen_tags or any(block_start in text or block_end in text for text in introduced):
+                return None
+            seen_tags.add(tag)
+
+            start, end = opens.get(tag), closes.get(tag)
+            found = start is not None and end is not None
+            if found and end[0] < start[0]:
+                return None
+
+            if removal:
+                if found:
+                    edits.append((start[0], end[1], ''))
+                continue
+
+            block_content = block_content.strip('\n')
+            full_block = f"{block_start}\n{block_content}\n{block_end}"
+            introduced.append(full_block)
+            self.patched_blocks.add(block_type)
+            if found:
+                edits.append((start[0], end[1], full_block))
+            else:
+                appends.append(full_block)
+
+        edits.sort()
+        parts = []
+        cursor = 0
+        for start, end, replacement in edits:
+            if start < cursor:
+                return None
+            parts.append(original_content[cursor:start])
+            parts.append(replacement)
+            cursor = end
+        # An edit reaching the end of the file can change the newline check for appends
+        if appends and edits and cursor == len(original_content):
+            return None
+        parts.append(original_content[cursor:])
+
+        patched = [''.join(parts)]
+        for full_block in appends:
+            if patched[-1] and not patched[-1].endswith('\n'):
+                patched.append('\n')
+            patched.append(full_block)
+        return ''.join(patched)
+    # [[/cc.block.method._splice_patch]]
+
+    # [[cc.block.method._apply_patch_sequentially]]
+    def _apply_patch_sequentially(self, original_content: str) -> str:
         patched_content = original_content
 
         for block_type, block_content in self.patch_content:
-            click.echo(f"Applying patch on code block '[[cc.block.{block_type}]]'")
             if 'remove' in block_type:
                 patched_content = self._remove_block(patched_content, block_type.replace('remove.', ''))
             else:
@@ -75,25 +172,32 @@ class CodePatcherCML:
                 self.patched_blocks.add(block_type)
 
         return patched_content
-    # [[/cc.block.method._process_patch]]
+    # [[/cc.block.method._apply_patch_sequentially]]
+
+    # [[cc.block.method._span_regex]]
+    def _span_regex(self, tag: str) -> re.Pattern:
+        span_re = self._span_re.get(tag)
+        if span_re is None:
+            escaped = re.escape(tag)
+            span_re = re.compile(rf'# \[\[cc\.block\.{escaped}\]\].*?# \[\[/cc\.block\.{escaped}\]\]', re.DOTALL)
+            self._span_re[tag] = span_re
+        return span_re
+    # [[/cc.block.method._span_regex]]
 
     # [[cc.block.method._add_or_replace_block]]
     def _add_or_replace_block(self, content: str, block_type: str, block_content: str) -> str:
-        block_start = f"# [[cc.block.{block_type}]]"
-        block_end = f"# [[/cc.block.{block_type}]]"
-        
+        block_start, block_end = block_markers(block_type)
+
         # Remove any leading or trailing newlines from block_content
         block_content = block_content.strip('\n')
         
         # Construct full_block without adding extra newlines
         full_block = f"{block_start}\n{block_content}\n{block_end}"
         
-        start_index = content.find(block_start)
-        end_index = content.find(block_end)
-        if start_index != -1 and end_index != -1:
-            # Replace existing block
-            end_index += len(block_end)
-            return content[:start_index] + full_block + content[end_index:]
+        # Replace existing block; a function replacement keeps backslashes in the code literal
+        patched_content, count = self._span_regex(block_type).subn(lambda _: full_block, content, count=1)
+        if count:
+            return patched_content
         else:
             # Add new block
             if content and not content.endswith('\n'):
@@ -104,16 +208,7 @@ class CodePatcherCML:
 
     # [[cc.block.method._remove_block]]
     def _remove_block(self, content: str, block_type: str) -> str:
-        block_start = f"# [[cc.block.{block_type}]]"
-        block_end = f"# [[/cc.block.{block_type}]]"
-        
-        start_index = content.find(block_start)
-        end_index = content.find(block_end)
-
-        if start_index != -1 and end_index != -1:
-            return content[:start_index] + content[end_index + len(block_end):]
-        
-        return content
+        return self._span_regex(block_type).sub('', content, count=1)
     # [[/cc.block.method._remove_block]]
 
 # [[/cc.block.class.CodePatcherCML]]
@@ -12,28 +12,70 @@ import argparse
 import json
 import subprocess
 import sys
+import threading
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 # </.cg.imports>
 
 # <.cg.constants>
 JSON_OUTPUT_FILE = 'cogni_engineer_output.json'
 # </.cg.constants>
 
+# <.cg.function__drain_pipe>
+def _drain_pipe(pipe, lines, echo_stream=None):
+    """
+    Read a pipe line by line until EOF, collecting the lines and optionally echoing them.
+
+    Args:
+        pipe: The text pipe to read from.
+        lines (list): The list that receives each line read.
+        echo_stream: A stream to mirror each line to as it arrives (optional).
+    """
+    with pipe:
+        for line in pipe:
+            lines.append(line)
+            if echo_stream is not None:
+                echo_stream.write(line)
+                echo_stream.flush()
+# </.cg.function__drain_pipe>
+
 # <.cg.function_run_python_file>
-def run_python_file(filename):
+def run_python_file(filename, stream=False):
     """
     Run the specified Python file and capture its output and errors.
 
+    Output is read incrementally from the child's pipes as it is produced
+    rather than buffered until the process exits.
+
     Args:
         filename (str): The name of the Python file to execute.
+        stream (bool): Whether to mirror the child's stdout/stderr live while capturing it.
 
     Returns:
         tuple: A tuple containing (executed_output, error_occurred, error_message)
     """
     try:
-        result = subprocess.run([sys.executable, filename], capture_output=True, text=True, check=True)
-        return result.stdout, False, ''
-    except subprocess.CalledProcessError as e:
-        return e.stdout, True, e.stderr
+        process = subprocess.Popen(
+            [sys.executable, filename],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1
+        )
+        stdout_lines, stderr_lines = [], []
+        readers = [
+            threading.Thread(target=_drain_pipe, args=(process.stdout, stdout_lines, sys.stdout if stream else None)),
+            threading.Thread(target=_drain_pipe, args=(process.stderr, stderr_lines, sys.stderr if stream else None)),
+        ]
+        for reader in readers:
+            reader.start()
+        for reader in readers:
+            reader.join()
+        returncode = process.wait()
+
+        if returncode != 0:
+            return ''.join(stdout_lines), True, ''.join(stderr_lines)
+        return ''.join(stdout_lines), False, ''
     except Exception as e:
         return '', True, str(e)
 # </.cg.function_run_python_file>
@@ -63,13 +105,18 @@ def main():
     """Main function to run the CogniEngineer."""
     parser = argparse.ArgumentParser(description='Execute a Python file and capture its output and errors.')
     parser.add_argument('--input', required=True, help='The Python file to execute')
+    parser.add_argument('--stream', action='store_true', help='Show the program output live while it runs')
     args = parser.parse_args()
 
-    executed, error, error_message = run_python_file(args.input)
+    executed, error, error_message = run_python_file(args.input, stream=args.stream)
     output = create_json_output(executed, error, error_message)
 
-    with open(JSON_OUTPUT_FILE, 'w') as f:
-        json.dump(output, f, indent=2)
+    if orjson is not None:
+        with open(JSON_OUTPUT_FILE, 'wb') as f:
+            f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2))
+    else:
+        with open(JSON_OUTPUT_FILE, 'w') as f:
+            json.dump(output, f, indent=2)
 
     print(f"Execution results saved to {JSON_OUTPUT_FILE}")
 # </.cg.function_main>
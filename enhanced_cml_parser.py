@@ -1,22 +1,127 @@
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union
 import io
 import os
+import mmap
 import ast
+import copy
+import json
+import logging
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 class LanguageConfig:
+    __slots__ = ('start_marker', 'end_marker', 'end_marker_esc')
+
     def __init__(self, start_marker: str, end_marker: str = ''):
         self.start_marker = start_marker
         self.end_marker = end_marker
+        # Escaped once when LANGUAGE_CONFIGS is built, ready for the tag pattern
+        self.end_marker_esc = re.escape(end_marker)
+
+logger = logging.getLogger(__name__)
+
+# Any byte outside ASCII; the bytes token pattern's \w and \s only know ASCII
+_NON_ASCII_BYTE = re.compile(rb'[\x80-\xff]')
+
+# One pattern matches both an opening tag (key, params) and a closing tag (key); CMLParser pairs them.
+# Params stop at the next '[[' or ']]', so a malformed opener never scans past the next tag.
+# The pattern starts at the literal '[[' so the regex engine can jump between candidates
+# with a substring search; the optional comment marker in front is checked by CMLParser.
+# end_marker must already be escaped. Returns the str pattern and its bytes twin for
+# scanning undecoded (e.g. mapped) files.
+def _compile_token_re(end_marker: str) -> Tuple[re.Pattern, re.Pattern]:
+    pattern = (
+        rf'\[\[(?:cc\.([\w.]+)(?:,\s*params\s*=\s*((?:[^\[\]]|\[(?!\[)|\](?!\]))+?))?\]\]|/cc\.([\w.]+)\]\](?=\s*{end_marker}?))'
+    )
+    return re.compile(pattern, re.DOTALL), re.compile(pattern.encode('ascii'), re.DOTALL)
+
+# Words JSON accepts but Python literals do not
+_JSON_ONLY_RE = re.compile(r'\b(?:true|false|null|NaN|Infinity)\b')
+
+# Identical params strings repeat across a file, so each distinct one is evaluated once and
+# the resulting object is shared by every field parsed from it; CMLField copies on write
+@lru_cache(maxsize=1024)
+def _literal_params(params_str: str) -> Any:
+    # When strings use only one quote style and no escapes, every quote delimits a string,
+    # so the literal (with "'" swapped for '"') means the same as JSON and the C json
+    # parser can handle the common dict literal. Anything else goes to literal_eval, which
+    # unlike eval cannot run code from the parsed file.
+    if '\\' not in params_str and not _JSON_ONLY_RE.search(params_str):
+        json_str = None
+        if '"' not in params_str:
+            json_str = params_str.replace("'", '"')
+        elif "'" not in params_str:
+            json_str = params_str
+        if json_str is not None:
+            try:
+                return json.loads(json_str)
+            except ValueError:
+                pass
+    return ast.literal_eval(params_str)
+
+# Param values nothing can mutate, safe to hand out straight from shared params
+_IMMUTABLE_TYPES = frozenset((str, bytes, int, float, complex, bool, type(None)))
+
+# Opening prefix and closing line of a field, reused across exports of the same key
+@lru_cache(maxsize=4096)
+def _field_markers(start_marker: str, end_marker: str, key: str) -> Tuple[str, str]:
+    return f"{start_marker} [[cc.{key}", f"\n{start_marker} [[/cc.{key}]]{end_marker}"
 
 class CMLField:
-    def __init__(self, key: str, content: str, params: Dict[str, Any] = None):
+    __slots__ = ('key', 'content', '_params', '_shared')
+
+    def __init__(self, key: str, content: str, params: Dict[str, Any] = None, shared: bool = False):
         self.key = key
         self.content = content  # Store content exactly as it is, including leading/trailing whitespace
-        self.params = params or {}
+        self._params = params or {}
+        # True while _params is the cached object other fields may hold too
+        self._shared = shared
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        # Callers may mutate what they get, so shared params are copied on first access;
+        # the parser reads _params directly and never triggers the copy
+        if self._shared:
+            self._params = copy.deepcopy(self._params)
+            self._shared = False
+        return self._params
+
+    @params.setter
+    def params(self, params: Dict[str, Any]):
+        self._params = params
+        self._shared = False
+
+    def __repr__(self):
+        return f"CMLField(key={self.key}, params={self._params})"
+
+# Read-only view of a parser's fields in insertion order, behind CMLParser.fields.
+# It reads the parser's current _fields/_index on every access, so it stays live across
+# edits, lookups cost one index probe, and item assignment or deletion raises TypeError.
+class _FieldsView(Mapping):
+    __slots__ = ('_parser',)
+
+    def __init__(self, parser: 'CMLParser'):
+        self._parser = parser
+
+    def __getitem__(self, key: str) -> CMLField:
+        position = self._parser._index.get(key)
+        if position is None:
+            raise KeyError(key)
+        return self._parser._fields[position]
+
+    def __iter__(self):
+        return (field.key for field in self._parser._fields if field is not None)
+
+    def __len__(self) -> int:
+        return len(self._parser._index)
+
+    def __contains__(self, key) -> bool:
+        return key in self._parser._index
 
     def __repr__(self):
-        return f"CMLField(key={self.key}, params={self.params})"
+        return repr(dict(self))
 
 class CMLParser:
     LANGUAGE_CONFIGS = {
@@ -28,119 +133,322 @@ class CMLParser:
         'css': LanguageConfig('/*', '*/'),
         'cml': LanguageConfig(''),
     }
+    # Compiled str and bytes tag patterns per language, shared by every parser in the process
+    _PATTERN_CACHE: Dict[str, Tuple[re.Pattern, re.Pattern]] = {}
 
     def __init__(self, language: str = 'python'):
-        self.fields: Dict[str, CMLField] = {}
+        # Fields in insertion order; deleted or renamed fields leave a None tombstone
+        # so positions in _index stay valid without shifting the list
+        self._fields: List[Optional[CMLField]] = []
+        self._index: Dict[str, int] = {}
+        self._fields_view = _FieldsView(self)
         self.set_language(language)
 
+    @property
+    def fields(self) -> Mapping[str, CMLField]:
+        return self._fields_view
+
+    def _get_field(self, field_key: str) -> Optional[CMLField]:
+        position = self._index.get(field_key)
+        return None if position is None else self._fields[position]
+
+    def _params(self, field_key: str) -> Optional[Dict[str, Any]]:
+        # Read-only access: may be params shared with other fields
+        position = self._index.get(field_key)
+        return None if position is None else self._fields[position]._params
+
+    def _append_field(self, field: CMLField):
+        self._index[field.key] = len(self._fields)
+        self._fields.append(field)
+
+    def _drop_field(self, field_key: str) -> CMLField:
+        position = self._index.pop(field_key)
+        field = self._fields[position]
+        self._fields[position] = None
+        # Compact once tombstones outnumber live fields
+        if 2 * len(self._index) < len(self._fields):
+            self._fields = [f for f in self._fields if f is not None]
+            self._index = {f.key: i for i, f in enumerate(self._fields)}
+        return field
+
     def set_language(self, language: str):
-        self.language = language.lower()
-        if self.language not in self.LANGUAGE_CONFIGS:
+        lang = language.lower()
+        # Already configured for this language; nothing to look up again
+        if getattr(self, 'language', None) == lang:
+            return
+        if lang not in self.LANGUAGE_CONFIGS:
             raise ValueError(f"Unsupported language: {language}")
+        self.language = lang
         
         self.language_config = self.LANGUAGE_CONFIGS[self.language]
+        # Pick the tag-start check specialised for this language's marker
+        if len(self.language_config.start_marker) <= 1:
+            self._tag_start = self._tag_start_single
+        else:
+            self._tag_start = self._tag_start_multi
         self._compile_regexes()
 
     def _compile_regexes(self):
-        start_marker = re.escape(self.language_config.start_marker)
-        end_marker = re.escape(self.language_config.end_marker)
-        
-        self.field_pattern = re.compile(
-            rf'{start_marker}?\s*\[\[cc\.([\w.]+)(,\s*params\s*=\s*(.+?))?\]\](.*?){start_marker}?\s*\[\[/cc\.\1\]\]\s*{end_marker}?',
-            re.DOTALL
-        )
-
-    def parse_file(self, file_path: str) -> Dict[str, CMLField]:
-        with open(file_path, 'r') as file:
-            content = file.read()
-        
+        patterns = CMLParser._PATTERN_CACHE.get(self.language)
+        if patterns is None:
+            patterns = _compile_token_re(self.language_config.end_marker_esc)
+            CMLParser._PATTERN_CACHE[self.language] = patterns
+        self.token_pattern, self.token_pattern_bytes = patterns
+
+    def parse_file(self, file_path: str, warn_duplicates: bool = False) -> Dict[str, CMLField]:
+        # ASCII files are scanned as bytes and only the captured fields are decoded
         cml_file_path = f"{file_path}.cml"
         if os.path.exists(cml_file_path):
-            with open(cml_file_path, 'r') as cml_file:
-                content += "\n" + cml_file.read()
-        
-        return self.parse_content(content)
-
-    def parse_content(self, content: str) -> Dict[str, CMLField]:
-        self.fields = {}
-        for match in self.field_pattern.finditer(content):
-            key, _, params_str, field_content = match.groups()
+            with open(file_path, 'rb') as file, open(cml_file_path, 'rb') as cml_file:
+                content = b"\n".join((file.read(), cml_file.read()))
+            return self.parse_content(content, warn_duplicates)
+
+        with open(file_path, 'rb') as file:
+            # Empty files cannot be mapped
+            if os.fstat(file.fileno()).st_size == 0:
+                return self.parse_content(b"", warn_duplicates)
+            # Scan the read-only mapping directly; decoded fields do not reference it
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return self.parse_content(mapped, warn_duplicates)
+
+    def parse_files(self, paths: List[str], max_workers: Optional[int] = None) -> Dict[str, Dict[str, CMLField]]:
+        # Files are independent, so spread them over worker processes (each keeps one
+        # parser for this language) and hand out several paths per task
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.language,)) as executor:
+            return dict(zip(paths, executor.map(_parse_one, paths, chunksize=chunksize)))
+
+    def _tag_start_single(self, content: Union[str, bytes], bracket: int, lower: int, marker: Union[str, bytes]) -> int:
+        # _tag_start_multi specialised for markers of at most one character (python's '#',
+        # cml's ''), where nothing is required and only one character needs checking
+        start = bracket
+        while start > lower and content[start - 1:start].isspace():
+            start -= 1
+        if marker and start > lower and content[start - 1:start] == marker:
+            return start - 1
+        return start
+
+    def _tag_start_multi(self, content: Union[str, bytes], bracket: int, lower: int, marker: Union[str, bytes]) -> int:
+        # Where the tag at '[[' begins once its leading comment marker and whitespace are
+        # included, or -1 if the marker is required and missing. Only the marker's last
+        # character is optional (e.g. '//' needs at least one '/'), and the tag cannot
+        # begin before lower, the end of the previous tag. Slicing keeps this working on
+        # str, bytes and mmap content alike.
+        start = bracket
+        while start > lower and content[start - 1:start].isspace():
+            start -= 1
+        if not marker:
+            return start
+        required = marker[:-1]
+        if start - len(marker) >= lower and content[start - len(marker):start] == marker:
+            return start - len(marker)
+        if not required:
+            return start
+        if start - len(required) >= lower and content[start - len(required):start] == required:
+            return start - len(required)
+        return -1
+
+    def _scan_fields(self, content: Union[str, bytes]) -> List[Tuple[str, Optional[str], str]]:
+        # Single pass over the tag tokens, pairing each closing tag with the nearest open
+        # tag of the same key on a stack, so a field may contain fields with its own key.
+        # Only top-level fields are returned; nested ones stay inside their parent's
+        # content. Fields inside an opener that is never closed belong to its parent.
+        top_level = []
+        stack = []  # (key, content_start, params_str, closed child fields)
+        # Open count per key on the stack, so a stray closing tag never walks the stack
+        open_counts = {}
+        tag_start = self._tag_start
+        is_text = isinstance(content, str)
+        if is_text:
+            pattern, marker = self.token_pattern, self.language_config.start_marker
+        else:
+            pattern, marker = self.token_pattern_bytes, self.language_config.start_marker.encode('ascii')
+        # With a single-character (or no) marker nothing in front of '[[' is required, so
+        # an opening tag is always valid and its start, which no one reads, is skipped
+        openers_need_marker = len(marker) > 1
+        stack_append = stack.append
+        counts_get = open_counts.get
+        last_end = 0
+        for token in pattern.finditer(content):
+            bracket, end = token.span()
+            open_key, params_str, close_key = token.groups()
+            if open_key is not None:
+                if openers_need_marker and tag_start(content, bracket, last_end, marker) < 0:
+                    continue
+                last_end = end
+                stack_append((open_key, end, params_str, []))
+                open_counts[open_key] = counts_get(open_key, 0) + 1
+                continue
+
+            start = tag_start(content, bracket, last_end, marker)
+            if start < 0:
+                continue
+            last_end = end
+            if not counts_get(close_key):
+                continue
+
+            depth = len(stack) - 1
+            while stack[depth][0] != close_key:
+                depth -= 1
+            key, content_start, params_str, _ = stack[depth]
+            # Openers above the match were never closed and end up inside this field
+            for entry in stack[depth:]:
+                open_counts[entry[0]] -= 1
+            del stack[depth:]
+            field = (key, params_str, content[content_start:start])
+            (stack[-1][3] if stack else top_level).append(field)
+
+        for _, _, _, children in stack:
+            top_level.extend(children)
+        if not is_text:
+            top_level = [
+                (key.decode('ascii'), None if params_str is None else params_str.decode('utf-8'), field_content.decode('utf-8'))
+                for key, params_str, field_content in top_level
+            ]
+        return top_level
+
+    def parse_content(self, content: Union[str, bytes], warn_duplicates: bool = False) -> Dict[str, CMLField]:
+        # Non-ASCII bytes are decoded so keys and whitespace match as they do in text
+        if not isinstance(content, str) and _NON_ASCII_BYTE.search(content):
+            content = str(content, 'utf-8')
+        self._fields = fields = []
+        self._index = index = {}
+        # Duplicate keys in first-seen order, each reported once
+        duplicates = {}
+        # Bound once for the per-field loop
+        append_field = fields.append
+        index_get = index.get
+        parse_params = _literal_params
+        Field = CMLField
+        for key, params_str, field_content in self._scan_fields(content):
             params = {}
-            if params_str:
+            shared = False
+            stripped = params_str.strip() if params_str else ''
+            # Skip literal_eval for the common empty params
+            if stripped and stripped != '{}':
                 try:
-                    params = ast.literal_eval(params_str)
+                    # Fields with the same params text share the cached object until one is written
+                    params = parse_params(stripped)
+                    shared = True
                 except (SyntaxError, ValueError):
-                    print(f"Warning: Invalid params for {key}: {params_str}")
-            
-            if key in self.fields:
-                print(f"Warning: Duplicate field key found: {key}")
+                    logger.warning("Invalid params for %s: %s", key, params_str)
             
             # Store the field_content exactly as it is, without stripping
-            self.fields[key] = CMLField(key, field_content, params)
-        
-        return self.fields
+            field = Field(key, field_content, params, shared)
+            position = index_get(key)
+            if position is not None:
+                duplicates[key] = None
+                # A duplicate keeps the first occurrence's position, as a dict assignment would
+                fields[position] = field
+            else:
+                index[key] = len(fields)
+                append_field(field)
+
+        if warn_duplicates and duplicates:
+            logger.warning("Duplicate field keys found: %s", ", ".join(duplicates))
+        # A snapshot, so a later parse on this parser does not rewrite results already returned
+        return dict(self._fields_view)
 
     def get_param_value(self, field_key: str, param_name: str) -> Any:
-        field = self.fields.get(field_key)
-        if field:
-            return field.params.get(param_name)
-        print(f"Warning: Field {field_key} not found")
+        params = self._params(field_key)
+        if params is not None:
+            value = params.get(param_name)
+            if type(value) in _IMMUTABLE_TYPES:
+                return value
+            # A mutable value is returned from the field's own copy of its params
+            return self._get_field(field_key).params.get(param_name)
+        logger.warning("Field %s not found", field_key)
         return None
 
     def set_param_value(self, field_key: str, param_name: str, value: Any):
-        field = self.fields.get(field_key)
+        field = self._get_field(field_key)
         if field:
             field.params[param_name] = value
         else:
-            print(f"Warning: Field {field_key} not found")
+            logger.warning("Field %s not found", field_key)
 
     def change_field_name(self, old_key: str, new_key: str):
-        if old_key in self.fields:
-            field = self.fields.pop(old_key)
+        if old_key in self._index:
+            field = self._drop_field(old_key)
             field.key = new_key
-            self.fields[new_key] = field
+            position = self._index.get(new_key)
+            if position is not None:
+                # Renaming onto an existing key takes over its position, as a dict assignment would
+                self._fields[position] = field
+            else:
+                self._append_field(field)
         else:
-            print(f"Warning: Field {old_key} not found")
+            logger.warning("Field %s not found", old_key)
 
     def get_field_content(self, field_key: str) -> Optional[str]:
-        field = self.fields.get(field_key)
+        field = self._get_field(field_key)
         if field:
             return field.content
-        print(f"Warning: Field {field_key} not found")
+        logger.warning("Field %s not found", field_key)
         return None
 
     def delete_field(self, field_key: str):
-        if field_key in self.fields:
-            del self.fields[field_key]
+        if field_key in self._index:
+            self._drop_field(field_key)
         else:
-            print(f"Warning: Field {field_key} not found")
+            logger.warning("Field %s not found", field_key)
 
     def add_field(self, field_key: str, content: str, params: Dict[str, Any] = None):
-        if field_key in self.fields:
-            print(f"Warning: Field {field_key} already exists. Use replace_field_content to modify.")
+        if field_key in self._index:
+            logger.warning("Field %s already exists. Use replace_field_content to modify.", field_key)
         else:
-            self.fields[field_key] = CMLField(field_key, content, params or {})
+            self._append_field(CMLField(field_key, content, params or {}))
 
     def replace_field_content(self, field_key: str, new_content: str):
-        field = self.fields.get(field_key)
+        field = self._get_field(field_key)
         if field:
             field.content = new_content
         else:
-            print(f"Warning: Field {field_key} not found")
+            logger.warning("Field %s not found", field_key)
 
     def generate_cml_field(self, field: CMLField) -> str:
-        start_marker = self.language_config.start_marker
-        end_marker = self.language_config.end_marker
+        opener, closer = _field_markers(self.language_config.start_marker, self.language_config.end_marker, field.key)
         
-        params_str = f", params={field.params}" if field.params else ""
+        params = field._params
+        params_str = f", params={params}" if params else ""
         
         # Remove one trailing newline if it exists, as we'll add it back later
-        content = field.content[:-1] if field.content.endswith('\n') else field.content
+        content = field.content
+        if content[-1:] == '\n':
+            content = content[:-1]
         
-        return f"{start_marker} [[cc.{field.key}{params_str}]]{content}\n{start_marker} [[/cc.{field.key}]]{end_marker}"
+        return f"{opener}{params_str}]]{content}{closer}"
 
     def generate_cml_content(self) -> str:
-        return "\n\n".join(self.generate_cml_field(field) for field in self.fields.values())
+        # Same output as joining generate_cml_field results, built as one list of fragments
+        start_marker = self.language_config.start_marker
+        end_marker = self.language_config.end_marker
+        parts = []
+        extend = parts.extend
+        markers = _field_markers
+        for field in self._fields:
+            if field is None:
+                continue
+            opener, closer = markers(start_marker, end_marker, field.key)
+            content = field.content
+            if content[-1:] == '\n':
+                content = content[:-1]
+            params = field._params
+            extend((opener, f", params={params}" if params else "", "]]", content, closer, "\n\n"))
+        if parts:
+            parts.pop()
+        return "".join(parts)
+
+# Per-process parser used by CMLParser.parse_files workers
+_worker_parser: Optional[CMLParser] = None
+
+def _init_worker(language: str):
+    global _worker_parser
+    _worker_parser = CMLParser(language)
+
+def _parse_one(path: str) -> Dict[str, CMLField]:
+    return _worker_parser.parse_file(path)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+# [[cc.block.metadata]]
+'''
+File: file_utils.py
+Version: 1.0.0
+Last Updated: 2024-09-30
+Description: File helpers shared by the CogniCoder tools
+'''
+# [[/cc.block.metadata]]
+
+# [[cc.block.imports]]
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional
+# [[/cc.block.imports]]
+
+# [[cc.block.function.atomic_write]]
+@contextmanager
+def atomic_write(path: str, mode_from: Optional[str] = None, buffering: int = -1) -> Iterator[BinaryIO]:
+    """
+    Open a binary temp file next to path and rename it over path once the block completes.
+
+    A crash or exception never leaves a partially written path behind, and any existing
+    file other than path itself is left untouched.
+
+    Args:
+        path (str): The file to create or replace.
+        mode_from (Optional[str]): File whose permission bits the result gets; defaults to path.
+        buffering (int): Buffer size for the temp file, as for open().
+
+    Yields:
+        BinaryIO: The temp file to write the new content to.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.cml_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb', buffering=buffering) as f:
+            # mkstemp creates the file 0600; keep the permissions of the file being replaced
+            os.fchmod(f.fileno(), os.stat(mode_from or path).st_mode & 0o777)
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+# [[/cc.block.function.atomic_write]]
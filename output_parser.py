@@ -9,37 +9,129 @@ Description: Parser for CogniCoder output with separate parsing for code and exp
 
 # [[cc.block.imports]]
 import os
-import re
+import json
+import mmap
+import hashlib
 import click
+from functools import cached_property
 # [[/cc.block.imports]]
 
+# [[cc.block.constants]]
+OUT_OPEN_PREFIX = '[[cc.out.'
+OUT_CLOSE_PREFIX = '[[/cc.out.'
+CACHE_DIR = './.cache/parser'
+# Bump whenever _parse_raw_content or _scan_blocks change what they produce, so stale cache entries are ignored
+PARSER_VERSION = 2
+# [[/cc.block.constants]]
+
 # [[cc.block.class.OutputParser]]
 class OutputParser:
     """Parser for CogniCoder output with separate parsing for code and explanation blocks"""
 
     # [[cc.block.method.init]]
-    def __init__(self, input_file):
+    def __init__(self, input_file, cache_dir=None):
         """
         Initialize the OutputParser.
 
         Args:
-            input_file (str): Path to the input file containing the CogniCoder output.
+            input_file (str, os.PathLike or file): Path to, or an open text stream of, the CogniCoder output.
+            cache_dir (str): Directory for cached parse results keyed by parser version and content hash (default: None, no caching).
         """
         self.input_file = input_file
-        self.raw_content = self._load_input_file()
-        self.parsed_data = self._parse_raw_content()
+        self.cache_dir = cache_dir
     # [[/cc.block.method.init]]
 
+    # [[cc.block.method.raw_content]]
+    @cached_property
+    def raw_content(self):
+        """The raw content of the input file, loaded on first access."""
+        return self._load_input_file()
+    # [[/cc.block.method.raw_content]]
+
+    # [[cc.block.method.parsed_data]]
+    @cached_property
+    def parsed_data(self):
+        """All parsed blocks, loaded on first access."""
+        return self._load_parsed_data()
+    # [[/cc.block.method.parsed_data]]
+
     # [[cc.block.method.load_input_file]]
     def _load_input_file(self):
-        """Load the raw content from the input file."""
+        """Load the raw content from the input file or stream."""
+        if hasattr(self.input_file, 'read'):
+            return self.input_file.read()
         with open(self.input_file, 'r') as f:
             return f.read()
     # [[/cc.block.method.load_input_file]]
 
+    # [[cc.block.method.get_block]]
+    def get_block(self, block_name, optional=False):
+        """
+        Get a single block without loading or parsing the whole file.
+
+        The input file is memory-mapped and searched in place; only the block's
+        own bytes are decoded. Stream inputs fall back to the full parse.
+
+        Args:
+            block_name (str): The name of the cc.out block, e.g. 'code'.
+            optional (bool): Whether to return None instead of raising if the block is missing.
+
+        Returns:
+            str: The stripped block content, or None if it is optional and missing.
+
+        Raises:
+            ValueError: If a required block is not found.
+        """
+        if 'parsed_data' in self.__dict__ or hasattr(self.input_file, 'read'):
+            content = self.parsed_data.get(block_name)
+        else:
+            content = self._find_block_in_file(block_name)
+        if content is None and not optional:
+            raise ValueError(f"Required block '{block_name}' not found in the input file.")
+        return content
+    # [[/cc.block.method.get_block]]
+
+    # [[cc.block.method.find_block_in_file]]
+    def _find_block_in_file(self, block_name):
+        """Search the memory-mapped input file for a block and decode only its content."""
+        with open(self.input_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Same scan as the full parse, so both paths find the same block
+                return self._scan_blocks(mm, block_name).get(block_name)
+    # [[/cc.block.method.find_block_in_file]]
+
+    # [[cc.block.method.load_parsed_data]]
+    def _load_parsed_data(self):
+        """Return the parsed data from the cache if the content is unchanged, parsing and caching it otherwise."""
+        if not self.cache_dir:
+            return self._parse_raw_content()
+
+        digest = hashlib.blake2b(self.raw_content.encode('utf-8')).hexdigest()
+        cache_file = os.path.join(self.cache_dir, f"v{PARSER_VERSION}-{digest}.json")
+        try:
+            with open(cache_file, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+        parsed_data = self._parse_raw_content()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(parsed_data, f)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+        return parsed_data
+    # [[/cc.block.method.load_parsed_data]]
+
     # [[cc.block.method.parse_raw_content]]
     def _parse_raw_content(self):
         """Parse the raw content into structured data."""
+        self._blocks = self._scan_blocks(self.raw_content)
         parsed_data = {}
         parsed_data['filename'] = self._parse_block('filename')
         parsed_data['mode'] = self._parse_block('mode')
@@ -48,13 +140,67 @@ class OutputParser:
         return parsed_data
     # [[/cc.block.method.parse_raw_content]]
 
+    # [[cc.block.method.scan_blocks]]
+    @staticmethod
+    def _scan_blocks(content, wanted=None):
+        """
+        Extract every cc.out block from the content in a single left-to-right pass.
+
+        Each name gets the body between its first opening tag and the next closing tag with
+        that name, as a regex search for that one block would find, so blocks nested inside
+        another block's body are found too. Bytes-like content (e.g. a memory-mapped file)
+        is searched in place and only the block bodies are decoded.
+
+        Args:
+            content (str or bytes-like): The raw CogniCoder output.
+            wanted (str): Only extract this block (default: None, every block).
+
+        Returns:
+            dict: Block names mapped to their stripped content.
+        """
+        is_text = isinstance(content, str)
+        open_prefix, close_prefix, tag_end = OUT_OPEN_PREFIX, OUT_CLOSE_PREFIX, ']]'
+        if not is_text:
+            open_prefix, close_prefix, tag_end = (part.encode('utf-8') for part in (open_prefix, close_prefix, tag_end))
+            if wanted is not None:
+                wanted = wanted.encode('utf-8')
+        bracket = open_prefix[:1]
+
+        blocks = {}
+        # Names whose first opening tag has been looked at; a later one never changes the result
+        seen = set()
+        pos = content.find(open_prefix)
+        while pos != -1:
+            name_start = pos + len(open_prefix)
+            # Resume just past this prefix, so a stray '[[cc.out.' never hides a tag after it
+            pos = content.find(open_prefix, name_start)
+            name_end = content.find(tag_end, name_start)
+            if name_end == -1:
+                break
+            name = content[name_start:name_end]
+            # A name running into another tag comes from a stray prefix
+            if name in seen or bracket in name or (wanted is not None and name != wanted):
+                continue
+            seen.add(name)
+            body_start = name_end + 2
+            close = content.find(close_prefix + name + tag_end, body_start)
+            if close != -1:
+                body = content[body_start:close]
+                if is_text:
+                    blocks[name] = body.strip()
+                else:
+                    blocks[name.decode('utf-8')] = body.decode('utf-8').strip()
+            if wanted is not None:
+                break
+        return blocks
+    # [[/cc.block.method.scan_blocks]]
+
     # [[cc.block.method.parse_block]]
     def _parse_block(self, block_name, optional=False):
         """Parse a specific block from the raw content."""
-        pattern = rf'\[\[cc\.out\.{block_name}\]\](.*?)\[\[/cc\.out\.{block_name}\]\]'
-        match = re.search(pattern, self.raw_content, re.DOTALL)
-        if match:
-            return match.group(1).strip()
+        content = self._blocks.get(block_name)
+        if content is not None:
+            return content
         elif not optional:
             raise ValueError(f"Required block '{block_name}' not found in the input file.")
         return None
@@ -92,12 +238,21 @@ class OutputParser:
 
 # [[cc.block.main]]
 @click.command()
-@click.argument('input_file', type=click.Path(exists=True))
+@click.argument('input_file', type=click.Path(exists=True), required=False)
 @click.option('--output-dir', default='./parsed_output', help='The directory to save the parsed output files.')
-def main(input_file, output_dir):
+@click.option('--cache/--no-cache', default=True, help=f'Reuse parse results cached in {CACHE_DIR}.')
+@click.option('--stdin', 'from_stdin', is_flag=True, help='Read the CogniCoder output from stdin instead of INPUT_FILE.')
+@click.option('--stdout', 'to_stdout', is_flag=True, help='Write only the code block to stdout instead of saving files.')
+def main(input_file, output_dir, cache, from_stdin, to_stdout):
     """Parse CogniCoder output and save the results."""
-    parser = OutputParser(input_file)
-    parser.save_parsed_output(output_dir)
+    if from_stdin == bool(input_file):
+        raise click.UsageError("Provide exactly one of INPUT_FILE or --stdin.")
+
+    parser = OutputParser(click.get_text_stream('stdin') if from_stdin else input_file, cache_dir=CACHE_DIR if cache else None)
+    if to_stdout:
+        click.echo(parser.get_block('code'))
+    else:
+        parser.save_parsed_output(output_dir)
 
 if __name__ == "__main__":
     main()
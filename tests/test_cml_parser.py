@@ -0,0 +1,24 @@
+import io
+import unittest
+
+from cml_parser import CMLParser
+
+
+class CrossingTagsTest(unittest.TestCase):
+    CONTENT = "[[cc.block.b]]\n[[cc.out.a]]x\n[[/cc.block.b]]\ny[[/cc.out.a]]\n"
+
+    def test_parse_content_pairs_each_kind_independently(self):
+        parsed = CMLParser().parse_content(self.CONTENT)
+        self.assertEqual(parsed['out'], {'a': 'x\n[[/cc.block.b]]\ny'})
+        self.assertEqual(parsed['block'], [('b', '\n[[cc.out.a]]x\n')])
+
+    def test_parse_stream_pairs_each_kind_independently(self):
+        parsed = list(CMLParser().parse_stream(io.StringIO(self.CONTENT)))
+        self.assertEqual(parsed, [
+            {'type': 'block', 'tag': 'b', 'content': '[[cc.out.a]]x'},
+            {'type': 'out', 'tag': 'a', 'content': 'x\n[[/cc.block.b]]\ny'},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
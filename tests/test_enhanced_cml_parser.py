@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from enhanced_cml_parser import CMLParser
+
+
+class ParseResultTest(unittest.TestCase):
+    def test_parse_content_result_survives_later_parse(self):
+        parser = CMLParser('python')
+        first = parser.parse_content("# [[cc.a]]\nx\n# [[/cc.a]]\n")
+        second = parser.parse_content("# [[cc.b]]\ny\n# [[/cc.b]]\n")
+
+        self.assertEqual(list(first), ['a'])
+        self.assertEqual(first['a'].content, '\nx\n')
+        self.assertEqual(list(second), ['b'])
+        self.assertEqual(list(parser.fields), ['b'])
+
+    def test_fields_view_is_read_only(self):
+        parser = CMLParser('python')
+        parser.parse_content("# [[cc.a]]\nx\n# [[/cc.a]]\n")
+        with self.assertRaises(TypeError):
+            parser.fields['b'] = parser.fields['a']
+        with self.assertRaises(TypeError):
+            del parser.fields['a']
+
+
+class SharedParamsTest(unittest.TestCase):
+    CONTENT = (
+        "# [[cc.a, params={'k': 1, 'n': [1, {'z': 2}]}]]\nx\n# [[/cc.a]]\n"
+        "# [[cc.b, params={'k': 1, 'n': [1, {'z': 2}]}]]\ny\n# [[/cc.b]]\n"
+    )
+    EXPECTED = {'k': 1, 'n': [1, {'z': 2}]}
+
+    def test_mutating_params_does_not_leak(self):
+        parser = CMLParser('python')
+        parser.parse_content(self.CONTENT)
+        parser.fields['a'].params['k'] = 'MUT'
+        parser.get_param_value('a', 'n')[1]['z'] = 'MUT'
+        parser.set_param_value('a', 'q', 5)
+
+        self.assertEqual(parser.get_param_value('a', 'k'), 'MUT')
+        self.assertEqual(parser.fields['b'].params, self.EXPECTED)
+        fresh = CMLParser('python').parse_content(self.CONTENT)
+        self.assertEqual(fresh['a'].params, self.EXPECTED)
+
+
+class NonAsciiFileTest(unittest.TestCase):
+    CONTENT = "# [[cc.résumé]]\nx\n#\xa0[[/cc.résumé]]\n# [[cc.a]]\ncafé\xa0\n# [[/cc.a]]\n"
+
+    def test_parse_file_matches_parse_content(self):
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.py', delete=False) as f:
+            f.write(self.CONTENT)
+        self.addCleanup(os.remove, f.name)
+
+        expected = CMLParser('python').parse_content(self.CONTENT)
+        parsed = CMLParser('python').parse_file(f.name)
+
+        self.assertEqual(list(parsed), ['résumé', 'a'])
+        self.assertEqual({k: v.content for k, v in parsed.items()},
+                         {k: v.content for k, v in expected.items()})
+        self.assertEqual(parsed['résumé'].content, '\nx\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
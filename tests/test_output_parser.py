@@ -0,0 +1,53 @@
+import io
+import os
+import tempfile
+import unittest
+
+from output_parser import OutputParser
+
+
+def make_parser(content):
+    return OutputParser(io.StringIO(content))
+
+
+class ScanBlocksTest(unittest.TestCase):
+    def test_stray_prefix_before_real_block(self):
+        content = (
+            "Blocks look like [[cc.out. followed by a name.\n"
+            "[[cc.out.filename]]demo[[/cc.out.filename]]\n"
+            "[[cc.out.mode]]FULL[[/cc.out.mode]]\n"
+            "[[cc.out.code]]\nprint('hi')\n[[/cc.out.code]]\n"
+        )
+        parsed = make_parser(content).parsed_data
+        self.assertEqual(parsed['code'], "print('hi')")
+        self.assertEqual(parsed['filename'], 'demo')
+
+    def test_block_nested_in_another_block(self):
+        content = "[[cc.out.explanation]]see [[cc.out.code]]x[[/cc.out.code]][[/cc.out.explanation]]"
+        blocks = OutputParser._scan_blocks(content)
+        self.assertEqual(blocks['code'], 'x')
+        self.assertEqual(blocks['explanation'], 'see [[cc.out.code]]x[[/cc.out.code]]')
+
+
+class GetBlockTest(unittest.TestCase):
+    CONTENT = (
+        "[[cc.out.filename]]demo[[/cc.out.filename]]\n"
+        "[[cc.out.mode]]FULL[[/cc.out.mode]]\n"
+        "A stray [[cc.out. prefix, then [[cc.out.explanation]]see\n"
+        "[[cc.out.code]]\nprint('é')\n[[/cc.out.code]]\n"
+        "[[/cc.out.explanation]]\n"
+    )
+
+    def test_mapped_lookup_matches_full_parse(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'result.out')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.CONTENT)
+            parsed = OutputParser(path).parsed_data
+            for name in ('filename', 'mode', 'code', 'explanation'):
+                self.assertEqual(OutputParser(path).get_block(name), parsed[name])
+            self.assertEqual(parsed['code'], "print('é')")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,3 @@
-
 # <.cg.metadata>
 """
 File: utils.py
@@ -8,6 +7,19 @@ Description: Utility functions for CogniCoder
 """
 # </.cg.metadata>
 
+# <.cg.imports>
+import asyncio
+import functools
+import importlib.util
+
+from anthropic import Anthropic, AsyncAnthropic, DefaultAsyncHttpxClient, DefaultHttpxClient
+# </.cg.imports>
+
+# <.cg.constants>
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+# </.cg.constants>
+
 # <.cg.function_load_file_content>
 def load_file_content(file):
     """
@@ -21,3 +33,56 @@ def load_file_content(file):
     """
     return file.read() if file else None
 # </.cg.function_load_file_content>
+
+# <.cg.function_get_client>
+@functools.lru_cache(maxsize=1)
+def get_client(api_key):
+    """
+    Return a shared Anthropic client, creating it on first use.
+
+    Reusing one client keeps its connection pool warm, so later calls skip the
+    TCP/TLS handshake.
+
+    Args:
+        api_key (str): The Anthropic API key.
+
+    Returns:
+        Anthropic: The shared client for this API key.
+    """
+    http_client = DefaultHttpxClient(http2=HTTP2_AVAILABLE)
+    return Anthropic(api_key=api_key, http_client=http_client)
+# </.cg.function_get_client>
+
+# <.cg.function_get_async_client>
+def get_async_client(api_key):
+    """
+    Return the AsyncAnthropic client shared within the running event loop.
+
+    An async client's connections belong to the loop that opened them, so each
+    new loop (e.g. each asyncio.run batch) gets a fresh client.
+
+    Args:
+        api_key (str): The Anthropic API key.
+
+    Returns:
+        AsyncAnthropic: The shared async client for this API key and loop.
+    """
+    return _get_loop_async_client(api_key, asyncio.get_running_loop())
+# </.cg.function_get_async_client>
+
+# <.cg.function__get_loop_async_client>
+@functools.lru_cache(maxsize=1)
+def _get_loop_async_client(api_key, loop):
+    """
+    Create the AsyncAnthropic client for one event loop; the cache keeps only the latest loop's.
+
+    Args:
+        api_key (str): The Anthropic API key.
+        loop (asyncio.AbstractEventLoop): The event loop the client will be used on.
+
+    Returns:
+        AsyncAnthropic: A new async client for this API key.
+    """
+    http_client = DefaultAsyncHttpxClient(http2=HTTP2_AVAILABLE)
+    return AsyncAnthropic(api_key=api_key, http_client=http_client)
+# </.cg.function__get_loop_async_client>